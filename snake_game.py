@@ -6,9 +6,10 @@ Run with `python snake_game.py`.
 from __future__ import annotations
 
 import random
-from dataclasses import dataclass
+from collections import deque
 from enum import Enum, auto
-from typing import Iterable, List, Tuple
+from itertools import islice
+from typing import Deque, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 import pygame
 
@@ -23,69 +24,69 @@ class Direction(Enum):
 
     @property
     def vector(self) -> Tuple[int, int]:
-        if self == Direction.UP:
-            return (0, -1)
-        if self == Direction.DOWN:
-            return (0, 1)
-        if self == Direction.LEFT:
-            return (-1, 0)
-        if self == Direction.RIGHT:
-            return (1, 0)
-        raise ValueError("Invalid direction")
+        return _DIR_VECTOR[self]
 
     def opposite(self) -> "Direction":
-        mapping = {
-            Direction.UP: Direction.DOWN,
-            Direction.DOWN: Direction.UP,
-            Direction.LEFT: Direction.RIGHT,
-            Direction.RIGHT: Direction.LEFT,
-        }
-        return mapping[self]
+        return _DIR_OPPOSITE[self]
+
+
+_DIR_VECTOR = {
+    Direction.UP: (0, -1),
+    Direction.DOWN: (0, 1),
+    Direction.LEFT: (-1, 0),
+    Direction.RIGHT: (1, 0),
+}
 
+_DIR_OPPOSITE = {
+    Direction.UP: Direction.DOWN,
+    Direction.DOWN: Direction.UP,
+    Direction.LEFT: Direction.RIGHT,
+    Direction.RIGHT: Direction.LEFT,
+}
 
-@dataclass(frozen=True)
-class Point:
+
+class Point(NamedTuple):
     x: int
     y: int
 
-    def __add__(self, other: Tuple[int, int]) -> "Point":
-        dx, dy = other
-        return Point(self.x + dx, self.y + dy)
-
     def to_pixels(self, block_size: int) -> pygame.Rect:
         return pygame.Rect(self.x * block_size, self.y * block_size, block_size, block_size)
 
 
 class Snake:
     def __init__(self, initial_positions: Iterable[Point], direction: Direction) -> None:
-        self.body: List[Point] = list(initial_positions)
+        self.body: Deque[Point] = deque(initial_positions)
+        self.occupied: Set[Point] = set(self.body)
         self.direction = direction
-        self.next_direction = direction
         self.grow_pending = 0
+        self._collided = False
 
     @property
     def head(self) -> Point:
         return self.body[0]
 
     def turn(self, direction: Direction) -> None:
-        if direction == self.direction or direction == self.direction.opposite():
-            return
-        self.next_direction = direction
+        if direction is not self.direction and direction is not _DIR_OPPOSITE[self.direction]:
+            self.direction = direction
 
     def move(self) -> None:
-        self.direction = self.next_direction
-        new_head = self.head + self.direction.vector
-        self.body.insert(0, new_head)
+        dx, dy = _DIR_VECTOR[self.direction]
+        x, y = self.body[0]
+        new_head = Point(x + dx, y + dy)
+        self.body.appendleft(new_head)
         if self.grow_pending > 0:
             self.grow_pending -= 1
         else:
-            self.body.pop()
+            self.occupied.discard(self.body.pop())
+        # The tail has already been vacated, so any remaining hit is the body.
+        self._collided = new_head in self.occupied
+        self.occupied.add(new_head)
 
     def grow(self, segments: int = 1) -> None:
         self.grow_pending += segments
 
     def collides_with_self(self) -> bool:
-        return self.head in self.body[1:]
+        return self._collided
 
 
 class SnakeGame:
@@ -102,6 +103,17 @@ class SnakeGame:
     GRID_COLOR = (57, 62, 70)
     TEXT_COLOR = (238, 238, 238)
 
+    KEY_DIRECTIONS = {
+        pygame.K_UP: Direction.UP,
+        pygame.K_DOWN: Direction.DOWN,
+        pygame.K_LEFT: Direction.LEFT,
+        pygame.K_RIGHT: Direction.RIGHT,
+        pygame.K_w: Direction.UP,
+        pygame.K_s: Direction.DOWN,
+        pygame.K_a: Direction.LEFT,
+        pygame.K_d: Direction.RIGHT,
+    }
+
     def __init__(self) -> None:
         pygame.init()
         self.surface = pygame.display.set_mode(
@@ -111,6 +123,25 @@ class SnakeGame:
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont("Consolas", 24)
         self.large_font = pygame.font.SysFont("Consolas", 36, bold=True)
+        self._all_points = tuple(
+            Point(x, y) for x in range(self.WIDTH) for y in range(self.HEIGHT)
+        )
+        self._rects = [
+            [Point(x, y).to_pixels(self.BLOCK_SIZE) for x in range(self.WIDTH)]
+            for y in range(self.HEIGHT)
+        ]
+        self._background = pygame.Surface(self.surface.get_size()).convert()
+        self._background.fill(self.BACKGROUND_COLOR)
+        self.draw_grid(self._background)
+        self._build_game_over_surface()
+        self._event_handlers = {
+            pygame.QUIT: self._on_quit,
+            pygame.KEYDOWN: self._on_keydown,
+            pygame.WINDOWEXPOSED: self._on_expose,
+        }
+        # Keep events nothing handles (mouse motion etc.) out of the queue entirely.
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(self._event_handlers))
         self.reset()
 
     def reset(self) -> None:
@@ -118,115 +149,172 @@ class SnakeGame:
         center_y = self.HEIGHT // 2
         initial_points = [Point(center_x - i, center_y) for i in range(self.INITIAL_LENGTH)]
         self.snake = Snake(initial_points, Direction.RIGHT)
+        self.food: Optional[Point] = None
         self.spawn_food()
         self.score = 0
+        self._score_cached_value = -1
+        self._pending_direction: Optional[Direction] = None
+        self._dirty_cells: List[Point] = []
+        self._full_redraw = True
         self.game_over = False
 
     def spawn_food(self) -> None:
-        empty_spaces = {
-            Point(x, y)
-            for x in range(self.WIDTH)
-            for y in range(self.HEIGHT)
-        } - set(self.snake.body)
-        self.food = random.choice(tuple(empty_spaces)) if empty_spaces else None
+        occupied = self.snake.occupied
+        # Rejection sampling is effectively O(1) until the board fills up.
+        if len(occupied) <= 0.9 * self.WIDTH * self.HEIGHT:
+            while True:
+                x = random.randrange(self.WIDTH)
+                y = random.randrange(self.HEIGHT)
+                point = Point(x, y)
+                if point not in occupied:
+                    self.food = point
+                    return
+        empty_spaces = [point for point in self._all_points if point not in occupied]
+        self.food = random.choice(empty_spaces) if empty_spaces else None
 
     def run(self) -> None:
         while True:
             self.handle_events()
             if not self.game_over:
                 self.update()
-            self.draw()
-            self.clock.tick(self.FPS)
+            # Nothing changes on the game-over screen until a key or expose event.
+            if self._full_redraw or self._dirty_cells:
+                self.draw()
+            if self.game_over:
+                # Nothing animates on the game-over screen, so let SDL sleep.
+                self.clock.tick(self.FPS)
+            else:
+                # SDL_Delay is too coarse at low frame rates; spin for the last stretch.
+                self.clock.tick_busy_loop(self.FPS)
 
     def handle_events(self) -> None:
+        handlers = self._event_handlers
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                raise SystemExit
-            if event.type == pygame.KEYDOWN:
-                if event.key in (pygame.K_ESCAPE, pygame.K_q):
-                    pygame.quit()
-                    raise SystemExit
-                if event.key == pygame.K_SPACE and self.game_over:
-                    self.reset()
-                direction = {
-                    pygame.K_UP: Direction.UP,
-                    pygame.K_DOWN: Direction.DOWN,
-                    pygame.K_LEFT: Direction.LEFT,
-                    pygame.K_RIGHT: Direction.RIGHT,
-                    pygame.K_w: Direction.UP,
-                    pygame.K_s: Direction.DOWN,
-                    pygame.K_a: Direction.LEFT,
-                    pygame.K_d: Direction.RIGHT,
-                }.get(event.key)
-                if direction:
-                    self.snake.turn(direction)
+            handler = handlers.get(event.type)
+            if handler is not None:
+                handler(event)
+
+    def _on_quit(self, event: pygame.event.Event) -> None:
+        pygame.quit()
+        raise SystemExit
+
+    def _on_expose(self, event: pygame.event.Event) -> None:
+        self._full_redraw = True
+
+    def _on_keydown(self, event: pygame.event.Event) -> None:
+        if event.key in (pygame.K_ESCAPE, pygame.K_q):
+            self._on_quit(event)
+        if event.key == pygame.K_SPACE and self.game_over:
+            self.reset()
+        direction = self.KEY_DIRECTIONS.get(event.key)
+        # Only the last turn of the frame is applied, once, in update().
+        if direction is not None:
+            self._pending_direction = direction
 
     def update(self) -> None:
-        self.snake.move()
-        if not (0 <= self.snake.head.x < self.WIDTH and 0 <= self.snake.head.y < self.HEIGHT):
+        if self._pending_direction is not None:
+            self.snake.turn(self._pending_direction)
+            self._pending_direction = None
+        snake = self.snake
+        old_head = snake.head
+        old_tail = snake.body[-1]
+        snake.move()
+        head = snake.head
+        if not (0 <= head.x < self.WIDTH and 0 <= head.y < self.HEIGHT):
             self.game_over = True
+            self._full_redraw = True
             return
-        if self.snake.collides_with_self():
+        if snake.collides_with_self():
             self.game_over = True
+            self._full_redraw = True
             return
-        if self.food and self.snake.head == self.food:
-            self.snake.grow()
+        if head == self.food:
+            snake.grow()
             self.score += 1
             self.spawn_food()
+            # New food and score text; eating is rare enough to repaint everything.
+            self._full_redraw = True
+            return
+        self._dirty_cells.append(old_head)
+        self._dirty_cells.append(head)
+        if old_tail not in snake.occupied:
+            self._dirty_cells.append(old_tail)
+
+    def _build_game_over_surface(self) -> None:
+        # The overlay and its text never change, so bake them into one surface.
+        self._game_over_surface = pygame.Surface(self.surface.get_size(), pygame.SRCALPHA)
+        self._game_over_surface.fill((0, 0, 0, 160))
+        text = self.large_font.render("Game Over", True, self.TEXT_COLOR)
+        restart = self.font.render("Press SPACE to play again", True, self.TEXT_COLOR)
+        rect = text.get_rect(center=(self.surface.get_width() / 2, self.surface.get_height() / 2 - 20))
+        restart_rect = restart.get_rect(
+            center=(self.surface.get_width() / 2, self.surface.get_height() / 2 + 20)
+        )
+        self._game_over_surface.blit(text, rect)
+        self._game_over_surface.blit(restart, restart_rect)
 
-    def draw_grid(self) -> None:
+    def draw_grid(self, surface: pygame.Surface) -> None:
         for x in range(self.WIDTH):
             pygame.draw.line(
-                self.surface,
+                surface,
                 self.GRID_COLOR,
                 (x * self.BLOCK_SIZE, 0),
                 (x * self.BLOCK_SIZE, self.HEIGHT * self.BLOCK_SIZE),
             )
         for y in range(self.HEIGHT):
             pygame.draw.line(
-                self.surface,
+                surface,
                 self.GRID_COLOR,
                 (0, y * self.BLOCK_SIZE),
                 (self.WIDTH * self.BLOCK_SIZE, y * self.BLOCK_SIZE),
             )
 
     def draw(self) -> None:
-        self.surface.fill(self.BACKGROUND_COLOR)
-        self.draw_grid()
-        for segment in self.snake.body[1:]:
-            pygame.draw.rect(
-                self.surface,
-                self.SNAKE_COLOR,
-                segment.to_pixels(self.BLOCK_SIZE),
-            )
-        pygame.draw.rect(
-            self.surface,
-            self.SNAKE_HEAD_COLOR,
-            self.snake.head.to_pixels(self.BLOCK_SIZE),
-        )
+        if self._full_redraw:
+            self._draw_full()
+            self._full_redraw = False
+        elif self._dirty_cells:
+            self._draw_dirty()
+        self._dirty_cells.clear()
+
+    def _draw_dirty(self) -> None:
+        rects = self._rects
+        updated = [rects[cell.y][cell.x] for cell in self._dirty_cells]
+        # Repainting under the anti-aliased score text would blend its edges again.
+        if self._score_rect.collidelist(updated) != -1:
+            self._draw_full()
+            return
+        occupied = self.snake.occupied
+        head = self.snake.head
+        for cell, rect in zip(self._dirty_cells, updated):
+            if cell == head:
+                pygame.draw.rect(self.surface, self.SNAKE_HEAD_COLOR, rect)
+            elif cell in occupied:
+                pygame.draw.rect(self.surface, self.SNAKE_COLOR, rect)
+            else:
+                self.surface.blit(self._background, rect, rect)
+        pygame.display.update(updated)
+
+    def _draw_full(self) -> None:
+        self.surface.blit(self._background, (0, 0))
+        rects = self._rects
+        for segment in islice(self.snake.body, 1, None):
+            pygame.draw.rect(self.surface, self.SNAKE_COLOR, rects[segment.y][segment.x])
+        head = self.snake.head
+        # After a wall hit the head sits just outside the grid and isn't cached.
+        if 0 <= head.x < self.WIDTH and 0 <= head.y < self.HEIGHT:
+            pygame.draw.rect(self.surface, self.SNAKE_HEAD_COLOR, rects[head.y][head.x])
         if self.food:
-            pygame.draw.rect(
-                self.surface,
-                self.FOOD_COLOR,
-                self.food.to_pixels(self.BLOCK_SIZE),
-            )
+            pygame.draw.rect(self.surface, self.FOOD_COLOR, rects[self.food.y][self.food.x])
 
-        score_surface = self.font.render(f"Score: {self.score}", True, self.TEXT_COLOR)
-        self.surface.blit(score_surface, (10, 10))
+        if self.score != self._score_cached_value:
+            self._score_surface = self.font.render(f"Score: {self.score}", True, self.TEXT_COLOR)
+            self._score_rect = self._score_surface.get_rect(topleft=(10, 10))
+            self._score_cached_value = self.score
+        self.surface.blit(self._score_surface, self._score_rect)
 
         if self.game_over:
-            overlay = pygame.Surface(self.surface.get_size(), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 160))
-            self.surface.blit(overlay, (0, 0))
-            text = self.large_font.render("Game Over", True, self.TEXT_COLOR)
-            restart = self.font.render("Press SPACE to play again", True, self.TEXT_COLOR)
-            rect = text.get_rect(center=(self.surface.get_width() / 2, self.surface.get_height() / 2 - 20))
-            restart_rect = restart.get_rect(
-                center=(self.surface.get_width() / 2, self.surface.get_height() / 2 + 20)
-            )
-            self.surface.blit(text, rect)
-            self.surface.blit(restart, restart_rect)
+            self.surface.blit(self._game_over_surface, (0, 0))
 
         pygame.display.flip()
 